@@ -1,9 +1,14 @@
 """Simple bokeh plotting API."""
 
 import argparse
+import contextlib
+import functools
 import importlib
 import json
+import os
+import re
 import warnings
+import weakref
 
 from bokeh.colors import RGB
 from bokeh.embed.util import OutputDocumentFor, standalone_docs_json
@@ -11,20 +16,50 @@ import bokeh.io as bkio
 from bokeh.layouts import gridplot
 from bokeh.plotting import Figure
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 __version__ = "0.6.15"
 
 # we don't run a comprehensive test suite and mostly in notebooks,
-# so show warnings all the time.
-warnings.simplefilter('always', DeprecationWarning)
+# so optionally show warnings all the time.
+_WARN_ALWAYS = bool(os.environ.get('APLANAT_WARN_ALWAYS'))
+if _WARN_ALWAYS:
+    warnings.simplefilter('always', DeprecationWarning)
+
+_warned = set()
+_HEX_COLOUR = re.compile(
+    r'#(?:[0-9a-fA-F]{3,4}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})')
 
 
-class Grid(list):
-    """Create a list of lists of fixed length."""
+def _deprecated(name, message):
+    """Issue a DeprecationWarning once for a named function.
+
+    :param name: name of the deprecated function.
+    :param message: the warning message.
+    """
+    if name in _warned and not _WARN_ALWAYS:
+        return
+    _warned.add(name)
+    warnings.warn(message, DeprecationWarning, stacklevel=3)
+
+
+class Grid(object):
+    """Create a list of lists of fixed length.
+
+    Items are stored flat and split into rows of `width` on access. The
+    last row is the one being filled, so is empty for an empty grid or
+    when the other rows are full.
+    """
+
+    __slots__ = ('width', '_items')
 
     def __init__(self, width=4):
         """Initialize the Grid."""
         self.width = width
-        self.append(list())
+        self._items = list()
 
     def add(self, item):
         """Add an item to the grid.
@@ -32,9 +67,7 @@ class Grid(list):
         :param item: item to add
 
         """
-        self[-1].append(item)
-        if len(self[-1]) == self.width:
-            self.append(list())
+        self._items.append(item)
 
     def extend(self, items):
         """Add multiple items.
@@ -42,89 +75,219 @@ class Grid(list):
         :param items: items to add.
 
         """
-        for item in items:
-            self.add(item)
+        self._items.extend(items)
+
+    @property
+    def rows(self):
+        """Return the items as a list of rows."""
+        items, width = self._items, self.width
+        return [items[i:i + width] for i in range(0, len(items) + 1, width)]
+
+    def __iter__(self):
+        """Iterate over rows of the grid."""
+        return iter(self.rows)
+
+    def __len__(self):
+        """Return the number of rows in the grid."""
+        return len(self._items) // self.width + 1
+
+    def __getitem__(self, index):
+        """Return a row of the grid."""
+        return self.rows[index]
 
 
 def all_children(plotlike):
-    """Recursively find all Figures in a plotting layout.
+    """Find all Figures in a plotting layout.
 
     :param plotlike: a bokeh layout or plot.
     """
     my_children = []
-    if hasattr(plotlike, 'children'):
-        for child in plotlike.children:
-            if isinstance(child, tuple):
-                child = child[0]
-            my_children.extend(all_children(child))
-    if isinstance(plotlike, Figure):
-        my_children.append(plotlike)
+    append = my_children.append
+    stack = [plotlike]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Figure):
+            append(node)
+        children = getattr(node, 'children', None)
+        if children:
+            # reversed, such that children are visited in order
+            stack.extend(
+                child[0] if isinstance(child, tuple) else child
+                for child in reversed(children))
     return my_children
 
 
-def show(plot, background=None):
+# flattened Figure lists for layouts passed to `show(..., cache=True)`, see
+# `invalidate_children_cache` should the layout be modified.
+_children_cache = weakref.WeakKeyDictionary()
+
+
+def _cached_children(plotlike):
+    """Return `all_children(plotlike)`, caching the result.
+
+    :param plotlike: a bokeh layout or plot.
+    """
+    try:
+        return _children_cache[plotlike]
+    except KeyError:
+        pass
+    except TypeError:
+        # not weak-referenceable (or hashable), don't cache
+        return all_children(plotlike)
+    children = all_children(plotlike)
+    _children_cache[plotlike] = children
+    return children
+
+
+def invalidate_children_cache(plotlike=None):
+    """Forget cached Figures of a layout, for use after modifying it.
+
+    :param plotlike: a bokeh layout or plot, if None the whole cache is
+        cleared.
+    """
+    if plotlike is None:
+        _children_cache.clear()
+    else:
+        _children_cache.pop(plotlike, None)
+
+
+@contextlib.contextmanager
+def _hold(children):
+    """Collect document change events whilst modifying plots.
+
+    :param children: list of Figures, the document of the first is held.
+    """
+    doc = children[0].document if children else None
+    if doc is None:
+        yield
+        return
+    doc.hold('collect')
+    try:
+        yield
+    finally:
+        doc.unhold()
+
+
+def show(plot, background=None, cache=False):
     """Show a plot in a notebook.
 
     :param background: a fill colour for the plot background, hex string or RGB
         tuple.
+    :param cache: reuse the Figures found in `plot` by a previous call. If
+        the layout is modified in between, `invalidate_children_cache`
+        must be called.
 
     """
-    children = all_children(plot)
-    orig_colours = None
+    if cache:
+        children = _cached_children(plot)
+    else:
+        children = all_children(plot)
     if background is not None:
         if isinstance(background, tuple):
             background = RGB(*background)
-        elif not (isinstance(background, str) and background.startswith('#')):
+        elif not (
+                isinstance(background, str)
+                and _HEX_COLOUR.fullmatch(background)):
             raise TypeError(
                 "`background` should be a RGB tuple or hex-colour string.")
-        orig_colours = list()
-        for child in children:
-            orig_colours.append((
-                child.background_fill_color,
-                child.border_fill_color))
-            child.background_fill_color = background
-            child.border_fill_color = background
+        orig_backgrounds = [x.background_fill_color for x in children]
+        orig_borders = [x.border_fill_color for x in children]
+        with _hold(children):
+            for child in children:
+                child.background_fill_color = background
+                child.border_fill_color = background
     bkio.output_notebook(hide_banner=True)
     bkio.show(plot)
     if background is not None:
-        for colours, child in zip(orig_colours, children):
-            child.background_fill_color = colours[0]
-            child.border_fill_color = colours[1]
+        with _hold(children):
+            for child, fill, border in zip(
+                    children, orig_backgrounds, orig_borders):
+                child.background_fill_color = fill
+                child.border_fill_color = border
 
 
-def json_item(plot, target=None, theme=None, always_new=True):
+# documents exported by `json_item(..., cache=True)`
+_json_item_cache = weakref.WeakKeyDictionary()
+
+
+def json_item(plot, target=None, theme=None, always_new=True, cache=False):
     """Export a plot to a JSON doc.
 
     :param plot: the Bokeh object to embed.
     :param target: a div id to embed the model into.
     :param theme: applies a specified theme.
     :param always_new: force creation of a new document.
+    :param cache: reuse the document from a previous call with the same
+        plot, provided the set of models the plot references is unchanged.
+        Changes to properties of existing models are not detected so this
+        should be used only for plots which are not modified between calls.
 
     This is a reimplementation of bokeh.embed.json_item that exposes
     the `always_new` option and by default sets it to obtain a
     truly independent plot document.
     """
-    with OutputDocumentFor(
-            [plot], apply_theme=theme, always_new=always_new) as doc:
+    key = None
+    if cache and theme is None:
+        key = (always_new, frozenset(id(x) for x in plot.references()))
+        cached_key, doc_json = _json_item_cache.get(plot, (None, None))
+        if cached_key == key:
+            root_id = doc_json['roots']['root_ids'][0]
+            return {'target_id': target, 'root_id': root_id, 'doc': doc_json}
+
+    doc = plot.document
+    if (not always_new and theme is None and doc is not None
+            and list(doc.roots) == [plot]):
+        # plot is already the sole root of its document, no need to
+        # create a temporary document
         doc.title = ""
         docs_json = standalone_docs_json([plot])
+    else:
+        with OutputDocumentFor(
+                [plot], apply_theme=theme, always_new=always_new) as doc:
+            doc.title = ""
+            docs_json = standalone_docs_json([plot])
 
-    doc_json = list(docs_json.values())[0]
+    doc_json = next(iter(docs_json.values()))
     root_id = doc_json['roots']['root_ids'][0]
+    if key is not None:
+        _json_item_cache[plot] = (key, doc_json)
 
     return {'target_id': target, 'root_id': root_id, 'doc': doc_json}
 
 
-def dump_json(plot, target=None, theme=None, always_new=True):
+def _orjson_dumps(data):
+    """Serialize a plot document to JSON bytes with orjson."""
+    return orjson.dumps(
+        data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def dump_json(
+        plot, target=None, theme=None, always_new=True, fp=None,
+        cache=False):
     """Create a JSON string representing a plot.
 
     :param plot: the Bokeh object to embed.
     :param target: a div id to embed the model into.
     :param theme: applies a specified theme.
     :param always_new: force creation of a new document.
+    :param fp: a text file-like object, if given the JSON is written to
+        this rather than being returned.
+    :param cache: reuse a previously exported document, see `json_item`.
+
+    If `orjson` is installed it is used for serialization, else the
+    standard library `json` module.
     """
-    data = json_item(plot, target=None, theme=None, always_new=always_new)
-    return json.dumps(data)
+    data = json_item(
+        plot, target=None, theme=None, always_new=always_new, cache=cache)
+    if orjson is not None:
+        text = _orjson_dumps(data).decode()
+        if fp is None:
+            return text
+        fp.write(text)
+    elif fp is None:
+        return json.dumps(data)
+    else:
+        json.dump(data, fp)
 
 
 def export_jsx(plot, fname):
@@ -133,11 +296,45 @@ def export_jsx(plot, fname):
     :param plot: bokeh plot object.
     :param fname: export filename.
     """
-    with open(fname, "w") as fh:
-        fh.write("const plotJson = ")
-        fh.write(dump_json(plot))
-        fh.write("\n")
-        fh.write("export default plotJson")
+    if orjson is not None:
+        # write the serialized bytes directly, without decoding a copy
+        data = json_item(plot)
+        with open(fname, "wb") as fh:
+            fh.write(b"const plotJson = ")
+            fh.write(_orjson_dumps(data))
+            fh.write(b"\n")
+            fh.write(b"export default plotJson")
+    else:
+        with open(fname, "w") as fh:
+            fh.write("const plotJson = ")
+            dump_json(plot, fp=fh)
+            fh.write("\n")
+            fh.write("export default plotJson")
+
+
+def export_binary(plot, fname, fmt='msgpack'):
+    """Export plot to a binary JSON-equivalent file.
+
+    :param plot: bokeh plot object.
+    :param fname: export filename.
+    :param fmt: one of `msgpack` or `cbor`. Requires the `msgpack` or
+        `cbor2` package respectively.
+
+    The output decodes to the same structure as `json_item`, e.g. using
+    `@msgpack/msgpack` in the browser, and can be passed directly to
+    `Bokeh.embed.embed_item`.
+    """
+    if fmt == 'msgpack':
+        import msgpack
+        encode = functools.partial(msgpack.packb, use_bin_type=True)
+    elif fmt == 'cbor':
+        import cbor2
+        encode = cbor2.dumps
+    else:
+        raise ValueError("`fmt` should be one of 'msgpack' or 'cbor'.")
+    data = json_item(plot)
+    with open(fname, "wb") as fh:
+        fh.write(encode(data))
 
 
 def grid(plots, ncol=4, display=True, **kwargs):
@@ -148,13 +345,14 @@ def grid(plots, ncol=4, display=True, **kwargs):
     :param kwargs: kwargs for bokeh `gridplot`.
 
     """
-    warnings.warn(
+    _deprecated(
+        'grid',
         "Please use `bokeh.layout.gridplot` directly with an optional "
-        "call to `.show()`", DeprecationWarning)
+        "call to `.show()`")
 
     grid = Grid(width=ncol)
     grid.extend(plots)
-    plot = gridplot(grid, **kwargs)
+    plot = gridplot(grid.rows, **kwargs)
     if display:
         show(plot)
     else:
@@ -164,23 +362,34 @@ def grid(plots, ncol=4, display=True, **kwargs):
 def InfoGraphItems():
     """Cumulatively create items for an infographic."""
     from aplanat import graphics
-    warnings.warn(
-        "This class has been moved to `aplanat.graphics.InfoGraphItems()`",
-        DeprecationWarning)
+    _deprecated(
+        'InfoGraphItems',
+        "This class has been moved to `aplanat.graphics.InfoGraphItems()`")
     return graphics.InfoGraphItems()
 
 
 def infographic(items, **kwargs):
     """Create an infographic 'plot'."""
     from aplanat import graphics
-    warnings.warn(
-        "This function has been moved to `aplanat.graphics.infographic()`",
-        DeprecationWarning)
+    _deprecated(
+        'infographic',
+        "This function has been moved to `aplanat.graphics.infographic()`")
     return graphics.infographic(items, **kwargs)
 
 
-def cli():
-    """Run aplanat entry point."""
+_cli_modules = [
+    'demo', 'bcfstats', 'mapula', 'nextclade',
+    'fastcat', 'simple', 'depthcoverage']
+
+
+def _cli_parser(parents=None):
+    """Create the entry point argument parser.
+
+    :param parents: dictionary mapping subcommand names to parent parsers,
+        subcommands without a parent accept no arguments of their own.
+    """
+    if parents is None:
+        parents = dict()
     parser = argparse.ArgumentParser(
         'aplanat',
         formatter_class=argparse.ArgumentDefaultsHelpFormatter)
@@ -194,14 +403,20 @@ def cli():
         help='additional help', dest='command')
     subparsers.required = True
 
-    # add reporting modules
-    modules = [
-        'demo', 'bcfstats', 'mapula', 'nextclade',
-        'fastcat', 'simple', 'depthcoverage']
-    for module in modules:
-        mod = importlib.import_module('aplanat.components.{}'.format(module))
-        p = subparsers.add_parser(module, parents=[mod.argparser()])
-        p.set_defaults(func=mod.main)
+    for module in _cli_modules:
+        if module in parents:
+            subparsers.add_parser(module, parents=[parents[module]])
+        else:
+            subparsers.add_parser(module, add_help=False)
+    return parser
 
+
+def cli():
+    """Run aplanat entry point."""
+    # find the subcommand before importing (only) its reporting module
+    args, _ = _cli_parser().parse_known_args()
+    mod = importlib.import_module(
+        'aplanat.components.{}'.format(args.command))
+    parser = _cli_parser(parents={args.command: mod.argparser()})
     args = parser.parse_args()
-    args.func(args)
+    mod.main(args)
@@ -1,6 +1,8 @@
 """Creation of bar-like plots."""
 
-from bokeh.models import Range1d
+from types import MappingProxyType
+
+from bokeh.models import ColumnDataSource, Range1d
 from bokeh.models.ranges import FactorRange
 from bokeh.plotting import figure
 import numpy as np
@@ -8,6 +10,20 @@ import pandas as pd
 
 from aplanat import util
 
+# default figure options, these can be overridden by kwargs
+_hbar_defaults = MappingProxyType({
+    'output_backend': 'webgl',
+    'y_range': [''],
+    'plot_height': 150, 'plot_width': 600,
+    'toolbar_location': None, 'tools': 'hover',
+    'tooltips': '@name: @value'})
+_bar_defaults = MappingProxyType({
+    'output_backend': 'webgl',
+    'plot_height': 300, 'plot_width': 600})
+_boxplot_defaults = MappingProxyType({
+    "output_backend": "webgl",
+    "height": 300, "width": 600})
+
 
 @util.plot_wrapper
 def single_hbar(values, classes, colors, **kwargs):
@@ -28,24 +44,19 @@ def single_hbar(values, classes, colors, **kwargs):
     if len(values) != len(classes) or len(values) != len(colors):
         raise ValueError(
             '`values`, `classes`, and `colors` must be of equal length.')
-    # describe our data
-    data = dict(zip(classes, ([x] for x in values)))
-    data['y_value'] = ['']
-
-    defaults = {
-        'output_backend': 'webgl',
-        'y_range': data['y_value'],
-        'plot_height': 150, 'plot_width': 600,
-        'toolbar_location': None, 'tools': 'hover',
-        'tooltips': '$name: @$name'}
-    defaults.update(kwargs)
-
-    p = figure(**defaults)
-    p.hbar_stack(
-        classes, y='y_value',
+    # describe our data, one row per stacked segment
+    values = np.asarray(values)
+    right = np.cumsum(values)
+    source = ColumnDataSource(dict(
+        y_value=[''] * len(values), left=right - values, right=right,
+        value=values, name=list(classes), color=list(colors)))
+
+    p = figure(**{**_hbar_defaults, **kwargs})
+    p.hbar(
+        y='y_value', left='left', right='right',
         height=0.9, alpha=0.7,
-        color=colors, source=data,
-        legend_label=classes)
+        color='color', source=source,
+        legend_field='name')
 
     # hide some plotting artefacts
     p.xgrid.grid_line_color = None
@@ -66,13 +77,9 @@ def simple_bar(
     """
     # see https://docs.bokeh.org/en/latest/docs/user_guide/categorical.html
     # for how boxplots can get complicated fast!
-    defaults = {
-        'output_backend': 'webgl',
-        'plot_height': 300, 'plot_width': 600}
-    defaults.update(kwargs)
     p = figure(
         x_range=groups,
-        **defaults)
+        **{**_bar_defaults, **kwargs})
     p.vbar(
         x=groups, top=counts,
         fill_color=colors, line_color=colors, width=0.9)
@@ -90,19 +97,14 @@ def simple_hbar(groups, counts, colors=util.Colors.cerulean, **kwargs):
     :param kwargs: kwargs for bokeh figure.
 
     """
-    defaults = {
-        'output_backend': 'webgl',
-        'plot_height': 300, 'plot_width': 600}
-    defaults.update(kwargs)
-    fig = figure(**defaults)
-    y = list(range(len(groups)))
+    fig = figure(**{**_bar_defaults, **kwargs})
+    y = np.arange(len(groups))
     fig.hbar(y, right=counts, height=0.5, line_color=colors, fill_color=colors)
     # Override the numerical labels with categories.
     # Setting labels this way, rather than with figure(y_range= ...)
     # ensures that category labels align with bars.
-    fig.yaxis.ticker = y
-    mapper = {k: v for (k, v) in zip(y, groups)}
-    fig.yaxis.major_label_overrides = mapper
+    fig.yaxis.ticker = y.tolist()
+    fig.yaxis.major_label_overrides = dict(enumerate(groups))
 
     return fig
 
@@ -130,9 +132,10 @@ def boxplot_series(
         * p.xaxis.axis_label = 'Read Length / bases'
         * p.yaxis.axis_label = 'Number of reads'
     """
-    df = pd.DataFrame(
-        dict(group=groups, value=values))
-    uniq = df.group.unique()
+    groups, values = np.asarray(groups), np.asarray(values)
+    if len(groups) != len(values):
+        raise ValueError("`groups` and `values` must be of equal length.")
+    uniq = pd.unique(groups)
     # numeric or categorical
     if not np.issubdtype(uniq.dtype, np.number):
         x_range = FactorRange(factors=uniq)
@@ -141,36 +144,44 @@ def boxplot_series(
         x_range = Range1d(
             start=xlim.min, end=xlim.max, bounds=(xlim.min, xlim.max))
 
-    # find the quartiles and IQR for each category
-    groups = df.groupby('group')
-    quantiles = groups.quantile([0.25, 0.5, 0.75])
-    quantiles.index.names = ['group', 'quantile']
-    uniq = groups.apply(lambda x: x.name).tolist()
-    q1 = quantiles.xs(0.25, level='quantile')
-    q2 = quantiles.xs(0.50, level='quantile')
-    q3 = quantiles.xs(0.75, level='quantile')
+    # find the quartiles and IQR for each category, sort values by group
+    # once and take the quantiles of each contiguous slice
+    codes, uniq = pd.factorize(groups, sort=True)
+    keep = codes >= 0
+    order = np.argsort(codes[keep], kind='stable')
+    sorted_codes, sorted_values = codes[keep][order], values[keep][order]
+    bounds = np.searchsorted(sorted_codes, np.arange(len(uniq) + 1))
+    sizes = np.diff(bounds)
+    if len(sizes) > 0 and sizes.max() * len(sizes) <= 2 * len(order):
+        # groups of similar size, NaN-pad into a matrix (one group per row)
+        # to compute all quantiles at once
+        mat = np.full((len(sizes), sizes.max()), np.nan)
+        cols = np.arange(len(sorted_values)) - bounds[sorted_codes]
+        mat[sorted_codes, cols] = sorted_values
+        q1, q2, q3 = np.nanquantile(mat, [0.25, 0.5, 0.75], axis=1)
+    else:
+        q1, q2, q3 = np.array([
+            np.nanpercentile(sorted_values[start:end], [25, 50, 75])
+            for start, end in zip(bounds[:-1], bounds[1:])]).T
+    uniq = uniq.tolist()
     iqr = q3 - q1
     upper = q3 + 1.5*iqr
     lower = q1 - 1.5*iqr
 
-    defaults = {
-        "output_backend": "webgl",
-        "height": 300, "width": 600}
-    defaults.update(kwargs)
-
-    ylim = util.Limiter().accumulate(df['value']).fix(*ylim)
+    ylim = util.Limiter().accumulate(values).fix(*ylim)
     y_range = Range1d(
         start=ylim.min, end=ylim.max, bounds=(ylim.min, ylim.max))
 
-    p = figure(**defaults, x_range=x_range, y_range=y_range)
-
-    # stems
-    p.segment(uniq, upper.value, uniq, q3.value, line_color="black")
-    p.segment(uniq, lower.value, uniq, q1.value, line_color="black")
+    p = figure(
+        **{**_boxplot_defaults, **kwargs}, x_range=x_range, y_range=y_range)
 
-    # boxes
-    for low, high in ((q2.value, q3.value), (q1.value, q2.value)):
-        p.vbar(
-            uniq, 0.8, low, high, line_color='black')
+    # stems and boxes, upper and lower halves drawn by the same glyph
+    xs = uniq + uniq
+    p.segment(
+        xs, np.concatenate((upper, lower)), xs, np.concatenate((q3, q1)),
+        line_color="black")
+    p.vbar(
+        xs, 0.8, np.concatenate((q2, q1)), np.concatenate((q3, q2)),
+        line_color='black')
 
     return p
@@ -1,11 +1,19 @@
 """Base functions for simple plots."""
 
-from bokeh.models import Range1d
+from types import MappingProxyType
+
+from bokeh.models import ColumnDataSource, Range1d
 from bokeh.plotting import figure
+import numpy as np
 
 from aplanat import util
 from aplanat.util import Limiter
 
+# default figure options, these can be overridden by kwargs
+_figure_defaults = MappingProxyType({
+    "output_backend": "webgl",
+    "height": 300, "width": 600})
+
 
 @util.plot_wrapper
 def simple(
@@ -50,31 +58,56 @@ def simple(
         raise IndexError(
             "Lengths of x_datas, y_datas, names, and colors should be equal.")
 
-    defaults = {
-        "output_backend": "webgl",
-        "height": 300, "width": 600}
-    defaults.update(kwargs)
+    if style not in ('line', 'points', 'steps'):
+        raise ValueError('Unknown plot style: "{}"'.format(style))
 
-    p = figure(**defaults)
+    p = figure(**{**_figure_defaults, **kwargs})
     x_lim = Limiter()
     y_lim = Limiter()
-    for x, y, name, color in zip(x_datas, y_datas, names, colors):
-        # TODO: add colours and names
-        x_lim.accumulate(x)
-        y_lim.accumulate(y)
-        kw = {}
-        if name is not None:
-            kw['legend_label'] = name
-        if color is not None:
-            kw['color'] = color
-        if style == 'line':
-            p.line(x=x, y=y, line_width=1.5, **kw)
-        elif style == 'points':
-            p.circle(x=x, y=y, alpha=0.4, **kw)
-        elif style == 'steps':
+    # find limits across all datasets at once
+    for lim, datas in ((x_lim, x_datas), (y_lim, y_datas)):
+        datas = [np.asarray(d) for d in datas if len(d) > 0]
+        if len(datas) > 0:
+            lim.accumulate(np.concatenate(datas))
+
+    if style == 'steps':
+        # there is no multi-step glyph, draw each dataset separately
+        for x, y, name, color in zip(x_datas, y_datas, names, colors):
+            kw = {}
+            if name is not None:
+                kw['legend_label'] = name
+            if color is not None:
+                kw['color'] = color
             p.step(x=x, y=y, line_width=1.5, mode=mode, **kw)
-        else:
-            raise ValueError('Unknown plot style: "{}"'.format(style))
+    else:
+        # draw datasets with a single glyph, styled per dataset. Unnamed
+        # datasets get their own glyph to keep them out of the legend.
+        colors = ['#1f77b4' if c is None else c for c in colors]
+        named = [i for i, name in enumerate(names) if name is not None]
+        unnamed = [i for i, name in enumerate(names) if name is None]
+        for index, kw in ((named, {'legend_field': 'name'}), (unnamed, {})):
+            if len(index) == 0:
+                continue
+            xs = [x_datas[i] for i in index]
+            ys = [y_datas[i] for i in index]
+            cs = [colors[i] for i in index]
+            ns = ['' if names[i] is None else names[i] for i in index]
+            if style == 'line':
+                source = ColumnDataSource(dict(
+                    xs=xs, ys=ys, color=cs, name=ns))
+                p.multi_line(
+                    xs='xs', ys='ys', line_color='color', line_width=1.5,
+                    source=source, **kw)
+            else:
+                sizes = [len(x) for x in xs]
+                source = ColumnDataSource(dict(
+                    x=np.concatenate([np.asarray(x) for x in xs]),
+                    y=np.concatenate([np.asarray(y) for y in ys]),
+                    color=np.repeat(cs, sizes),
+                    name=np.repeat(ns, sizes)))
+                p.circle(
+                    x='x', y='y', color='color', alpha=0.4, source=source,
+                    **kw)
     x_lim.fix(*xlim)
     y_lim.fix(*ylim)
 
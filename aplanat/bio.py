@@ -1,43 +1,33 @@
 """Bio specific plots, could be generalised."""
 
-from io import StringIO
+from types import MappingProxyType
 
-from bokeh.models import Range1d
+from bokeh.models import ColumnDataSource, Range1d
 from bokeh.models.tickers import FixedTicker
 from bokeh.plotting import figure
+from bokeh.transform import factor_cmap
 import numpy as np
 import pandas as pd
 
 from aplanat import util
 
-_chrom_data_ = """
-chrom length
-1 249250621
-2 243199373
-3 198022430
-4 191154276
-5 180915260
-6 171115067
-7 159138663
-8 146364022
-9 141213431
-10 135534747
-11 135006516
-12 133851895
-13 115169878
-14 107349540
-15 102531392
-16 90354753
-17 81195210
-18 78077248
-19 59128983
-20 63025520
-21 48129895
-22 51304566
-X 155270560
-Y 59373566
-"""
-_chrom_data_ = pd.read_csv(StringIO(_chrom_data_), delimiter=" ")
+_chrom_data_ = pd.DataFrame({
+    'chrom': [
+        '1', '2', '3', '4', '5', '6', '7', '8', '9', '10', '11', '12',
+        '13', '14', '15', '16', '17', '18', '19', '20', '21', '22', 'X',
+        'Y'],
+    'length': np.array([
+        249250621, 243199373, 198022430, 191154276, 180915260,
+        171115067, 159138663, 146364022, 141213431, 135534747,
+        135006516, 133851895, 115169878, 107349540, 102531392, 90354753,
+        81195210, 78077248, 59128983, 63025520, 48129895, 51304566,
+        155270560, 59373566],
+        dtype=np.int64)})
+
+# default figure options, these can be overridden by kwargs
+_figure_defaults = MappingProxyType({
+    "output_backend": "webgl",
+    "height": 300, "width": 600})
 
 
 @util.plot_wrapper
@@ -64,37 +54,54 @@ def karyotype(
         names = [None] * len(x_datas)
     if colors is None:
         colors = [None] * len(x_datas)
-    defaults = {
-        "output_backend": "webgl",
-        "height": 300, "width": 600}
-    defaults.update(kwargs)
-    p = figure(**defaults)
+    p = figure(**{**_figure_defaults, **kwargs})
     width = 0.8
-    chrom_order = pd.Series(range(1, len(chrom_data) + 1))
+    chroms = np.asarray(chrom_data['chrom'])
+    lengths = np.asarray(chrom_data['length'])
+    # chromosomes are plotted at 1, 2, ... in the order given
+    chrom_order = np.arange(1, len(chroms) + 1)
     p.rect(
-        chrom_data["length"] // 2, chrom_order,
-        chrom_data["length"], width,
+        lengths // 2, chrom_order, lengths, width,
         fill_color='white', line_color='black')
 
-    plot_order = dict(zip(chrom_data['chrom'], chrom_order))
-    for x, y, name, color in zip(x_datas, y_datas, names, colors):
-        y = np.array([plot_order[i] for i in y])
-        kw = {'alpha': alpha}
-        if name is not None:
-            kw['legend_label'] = name
-        if color is not None:
-            kw['color'] = color
-        p.segment(
-            x, y - width / 2, x, y + width / 2, **kw)
+    chrom_index = pd.Index(chroms)
+    if len(x_datas) > 0:
+        # draw all series with a single glyph, rows are coloured by
+        # their series index
+        sizes = [len(xs) for xs in x_datas]
+        y = chrom_index.get_indexer(np.concatenate(
+            [np.asarray(ys, dtype=object) for ys in y_datas]))
+        if np.any(y < 0):
+            raise KeyError("Chromosome name not present in `chrom_data`.")
+        y = y + 1
+        x = np.concatenate([np.asarray(xs) for xs in x_datas])
+        series = [str(i) for i in range(len(x_datas))]
+        color = factor_cmap(
+            'series', factors=series,
+            palette=['#1f77b4' if c is None else c for c in colors])
+        series = np.repeat(series, sizes)
+        labels = np.repeat(['' if n is None else n for n in names], sizes)
+        # unnamed series get their own glyph to keep them out of the legend
+        named = np.repeat([n is not None for n in names], sizes)
+        for rows, kw in ((named, {'legend_field': 'name'}), (~named, {})):
+            if not np.any(rows):
+                continue
+            source = ColumnDataSource(dict(
+                x=x[rows], y0=y[rows] - width / 2, y1=y[rows] + width / 2,
+                series=series[rows], name=labels[rows]))
+            p.segment(
+                'x', 'y0', 'x', 'y1', color=color, alpha=alpha,
+                source=source, **kw)
 
     # set up the axes
     p.xaxis.formatter.use_scientific = False
     p.yaxis.ticker = FixedTicker()
-    p.yaxis.ticker.ticks = chrom_order
-    p.yaxis.major_label_overrides = {v: k for k, v in plot_order.items()}
+    p.yaxis.ticker.ticks = chrom_order.tolist()
+    p.yaxis.major_label_overrides = dict(
+        zip(chrom_order.tolist(), chroms.tolist()))
+    max_length = lengths.max()
     p.x_range = Range1d(
-        start=0, end=max(chrom_data['length']),
-        bounds=(0, max(chrom_data['length'])))
+        start=0, end=max_length, bounds=(0, max_length))
     miny, maxy = 0, len(chrom_data) + 1
     p.y_range = Range1d(
         start=miny, end=maxy, bounds=(miny, maxy))
@@ -5,6 +5,7 @@ import argparse
 from bokeh.models import LinearColorMapper
 from bokeh.palettes import Blues9
 from bokeh.plotting import figure
+import numpy as np
 import pandas as pd
 
 from aplanat import hist
@@ -70,6 +71,14 @@ Base substitutions aggregated across all samples (symmetrised by pairing)
 """
 
 
+# substitutions paired with their complement, with reference A or C
+_canon_sub = {
+    'A>C': 'A>C', 'A>G': 'A>G', 'A>T': 'A>T',
+    'C>A': 'C>A', 'C>G': 'C>G', 'C>T': 'C>T',
+    'G>A': 'C>T', 'G>C': 'C>G', 'G>T': 'C>A',
+    'T>A': 'A>T', 'T>C': 'A>G', 'T>G': 'A>C'}
+
+
 def sub_matrix(bcf_stats, header=_sub_header, report=None):
     """Create a report section with a base substitution matrix.
 
@@ -83,26 +92,16 @@ def sub_matrix(bcf_stats, header=_sub_header, report=None):
     report = _maybe_new_report(report)
     report.markdown(header)
 
-    sim_sub = {
-        'G>A': 'C>T', 'G>C': 'C>G', 'G>T': 'C>A',
-        'T>A': 'A>T', 'T>C': 'A>G', 'T>G': 'A>C'}
-
-    def canon_sub(sub):
-        b1 = sub[0]
-        if b1 not in {'A', 'C'}:
-            return canon_sub(sim_sub[sub])
-        else:
-            return b1, sub[2]
-
     df = bcf_stats['ST']
-    df['canon_sub'] = df['type'].apply(canon_sub)
-    df['original'] = df['canon_sub'].apply(lambda x: x[0])
-    df['substitution'] = df['canon_sub'].apply(lambda x: x[1])
-    df['count'] = df['count'].astype(int)
-    df = df[['original', 'substitution', 'count']] \
-        .groupby(['original', 'substitution']) \
-        .agg(count=pd.NamedAgg(column='count', aggfunc='sum')) \
-        .reset_index()
+    codes, canon_sub = pd.factorize(df['type'].map(_canon_sub))
+    keep = codes >= 0
+    counts = np.bincount(
+        codes[keep], weights=df['count'].astype(int).to_numpy()[keep])
+    canon_sub = pd.Series(canon_sub)
+    df = pd.DataFrame({
+        'original': canon_sub.str[0],
+        'substitution': canon_sub.str[2],
+        'count': counts.astype(int)})
 
     colors = Blues9[::-1]
     mapper = LinearColorMapper(
@@ -155,15 +154,16 @@ def indel_lengths(
         # If there are no indels, bcftools doesn't contain the table
         report.markdown("*No indels to report.*")
     else:
-        df['nlength'] = df['length (deletions negative)'].astype(int)
-        df['count'] = df['number of sites'].astype(int)
+        # read into arrays rather than adding columns to the parsed table
+        nlength = df['length (deletions negative)'].to_numpy(dtype=np.int64)
+        sites = df['number of sites'].to_numpy(dtype=np.int64)
         # pad just to pull out axes by a minimum
-        pad = pd.DataFrame({'nlength': [-10, +10], 'count': [0, 0]})
-        counts = df.groupby('nlength') \
-            .agg(count=pd.NamedAgg(column='count', aggfunc='sum')) \
-            .reset_index().append(pad)
+        low = nlength.min(initial=-10)
+        high = nlength.max(initial=+10)
+        counts = np.bincount(
+            nlength - low, weights=sites, minlength=high - low + 1)
         plot = hist.histogram(
-            [counts['nlength']], weights=[counts['count']],
+            [np.arange(low, high + 1)], weights=[counts],
             colors=[color], binwidth=1,
             title='Insertion and deletion variant lengths',
             x_axis_label='Length / bases (deletions negative)',
@@ -1,7 +1,6 @@
 """Aplanat demo."""
 
 import argparse
-from copy import deepcopy
 
 from bokeh.layouts import gridplot
 import numpy as np
@@ -18,8 +17,9 @@ def main(args):
     util.set_basic_logging()
     logger = util.get_named_logger("Aplanat Demo")
 
-    x = np.random.normal(size=2000)
-    y = np.random.normal(size=2000)
+    rng = np.random.default_rng()
+    x = rng.standard_normal(2000)
+    y = rng.standard_normal(2000)
     sorted_xy = [np.sort(x), np.sort(x)]
 
     # Start a report
@@ -98,7 +98,7 @@ def main(args):
     logger.info("Adding boxplot")
     report.placeholder("boxplot preamble")
     x_discrete = np.around(x, 0)
-    x_str = [str(x) for x in np.abs(x_discrete)]
+    x_str = np.char.mod('%.1f', np.abs(x_discrete))
     report.plot(
         gridplot([
             bars.boxplot_series(x_discrete, y, width=300, title='continuous'),
@@ -118,13 +118,12 @@ def main(args):
     gallery.plot(plot)
 
     logger.info("Adding karyogram")
-    chrom_data = deepcopy(bio._chrom_data_)
-    chrom_data['chrom'] = chrom_data['chrom'].apply(lambda x: 'chr' + x)
-    chroms = np.random.choice(chrom_data['chrom'], size=10000)
-    positions = list()
-    for chrom in chroms:
-        length = chrom_data.loc[chrom_data['chrom'] == chrom, 'length']
-        positions.append(np.random.randint(length)[0])
+    chrom_data = bio._chrom_data_.assign(
+        chrom='chr' + bio._chrom_data_['chrom'].astype(str))
+    # sample chromosomes, then a position within each
+    index = rng.integers(len(chrom_data), size=10000)
+    chroms = chrom_data['chrom'].to_numpy()[index]
+    positions = rng.integers(chrom_data['length'].to_numpy()[index])
     plot = bio.karyotype([positions], [chroms], chrom_data=chrom_data)
     gallery.plot(plot)
 
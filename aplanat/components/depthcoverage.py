@@ -2,12 +2,19 @@
 """Create depth coverage report."""
 
 import argparse
+import functools
+import os
 
 from bokeh.layouts import gridplot, layout
 from bokeh.models import Panel, Tabs
 import numpy as np
 import pandas as pd
 
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
 from aplanat import lines
 from aplanat.report import _maybe_new_report, HTMLReport
 from aplanat.util import Colors
@@ -21,6 +28,42 @@ the output of [Mosdepth]
 (https://github.com/brentp/mosdepth).
 """
 
+# mosdepth BED outputs, these have no header line
+_bed_columns = ['ref', 'start', 'end']
+_bed_dtypes = {'ref': 'category', 'start': np.uint32, 'end': np.uint32}
+
+
+@functools.lru_cache(maxsize=8)
+def _read_depth_bed_file(fname, mtime, value, regions):
+    """Read a mosdepth BED file, cached by path and modification time."""
+    return _read_depth_bed(fname, value=value, regions=regions, cache=False)
+
+
+def _read_depth_bed(fname, value='depth', regions=True, cache=False):
+    """Read a mosdepth BED file.
+
+    :param fname: file path or buffer.
+    :param value: name for the depth column.
+    :param regions: read the region columns, else only the depths.
+    :param cache: reuse the result of a previous read of an unmodified
+        file. Cached frames are shared, so must not be modified, and
+        are kept alive until evicted; only enable for small files that
+        are read repeatedly.
+    """
+    if cache and isinstance(fname, (str, os.PathLike)):
+        fname = os.fspath(fname)
+        return _read_depth_bed_file(
+            fname, os.path.getmtime(fname), value, regions)
+    # use the multithreaded pyarrow parser if available, it does not
+    # however support usecols without a header line
+    engine = 'c'
+    if regions and pyarrow is not None:
+        engine = 'pyarrow'
+    return pd.read_csv(
+        fname, sep='\t', header=None, names=_bed_columns + [value],
+        usecols=None if regions else [value],
+        dtype=_bed_dtypes, engine=engine)
+
 
 def cumulative_depth_from_dist(depth_file: str, **kwargs):
     """Cumulative depth plots from mosdepth dist file.
@@ -33,7 +76,12 @@ def cumulative_depth_from_dist(depth_file: str, **kwargs):
     df = df[df.ref == 'total']
     df.sort_values('coverage', ascending=True, inplace=True)
     df.proportion = df.proportion * 100
-    df.drop_duplicates('proportion', inplace=True)
+    # proportions are cumulative so repeats are adjacent, keep the first
+    proportion = df['proportion'].to_numpy()
+    keep = np.empty(len(proportion), dtype=bool)
+    keep[:1] = True
+    np.not_equal(proportion[1:], proportion[:-1], out=keep[1:])
+    df = df[keep]
 
     p = lines.line(
         [df.coverage], [df.proportion],
@@ -43,43 +91,67 @@ def cumulative_depth_from_dist(depth_file: str, **kwargs):
     return p
 
 
-def cumulative_depth_from_bed(df: pd.DataFrame, bins: int = 2000, **kwargs):
+def _bases_at_depth(df):
+    """Count bases covered at each depth.
+
+    :param df: dataframe with start, end and depth columns.
+
+    :returns: tuple of (sorted) depths and base counts.
+    """
+    # Count bases covered by each "step" in the BED
+    steps = df['end'].to_numpy() - df['start'].to_numpy()
+    depths = df['depth'].to_numpy()
+
+    # Merge steps with the same depth together for total per-depth base count
+    if np.issubdtype(depths.dtype, np.integer):
+        x = np.flatnonzero(np.bincount(depths))
+        totals = np.bincount(depths, weights=steps)[x]
+    else:
+        # e.g. mean depths of windows
+        x, inverse = np.unique(depths, return_inverse=True)
+        totals = np.bincount(inverse, weights=steps)
+    return x, totals
+
+
+def cumulative_depth_from_bed(
+        df: pd.DataFrame, bins: int = 2000, chunksize: int = 1000000,
+        **kwargs):
     """Cumulative depth plot from a mosdepth bed derived dataframe.
 
-    :param df: depth dataframe
+    :param df: depth dataframe, or path to a mosdepth BED file which will
+        be read in chunks.
         Required columns:
         - start
         - end
         - depth
     :param: bins: number of bins to plot
+    :param: chunksize: number of lines to read at a time from a file.
     :param: kwargs: keyword arguments for aplanat.lines.line
     """
-    # Count bases covered by each "step" in the BED
-    df['step'] = df.end - df.start
-
-    # * Merge steps with the same depth together for total per-depth base count
-    # * Sort descending to count cumulatively as coverage decreases
-    #   ie. the proportion of counted bases approaches 1 as we reach 0 cov
-    df_agg = df.groupby("depth") \
-        .agg({"step": "sum"}) \
-        .sort_values("depth", ascending=False)
-    df_agg["step_cumsum"] = df_agg.step.cumsum()
-    df_agg["percent_at_depth"] = \
-        df_agg.step_cumsum / df_agg.step_cumsum.max() * 100
-
-    # Flip table to correct axes
-    df_agg = df_agg[::-1]
-
-    # Select slices (depths are accessed by .index)
-    x = df_agg.index.to_numpy()
-    y = df_agg.percent_at_depth.to_numpy()
-    if len(x) > bins:
-        binner = np.linspace(0, len(df_agg) - 1, bins).astype(int)
-        x_bin = np.array(x)[binner]
-        y_bin = np.array(y)[binner]
+    if isinstance(df, pd.DataFrame):
+        x, totals = _bases_at_depth(df)
     else:
-        x_bin = x
-        y_bin = y
+        # accumulate counts without holding the whole file in memory
+        counts = pd.Series(dtype=float)
+        for chunk in pd.read_csv(
+                df, sep='\t', header=None, names=_bed_columns + ['depth'],
+                dtype=_bed_dtypes, chunksize=chunksize):
+            x, totals = _bases_at_depth(chunk)
+            counts = counts.add(pd.Series(totals, index=x), fill_value=0)
+        counts = counts.sort_index()
+        x, totals = counts.index.to_numpy(), counts.to_numpy()
+
+    # Count cumulatively as coverage decreases, ie. the proportion of
+    # counted bases approaches 1 as we reach 0 cov
+    cumsum = np.cumsum(totals[::-1])[::-1]
+    y = cumsum / cumsum[0] * 100 if len(cumsum) > 0 else cumsum
+    # take every nth point (as views) to plot at most `bins` points,
+    # always keeping the last point to reach the maximum depth
+    stride = max(1, -(-(len(x) - 1) // max(1, bins - 1)))
+    x_bin, y_bin = x[::stride], y[::stride]
+    if len(x) > 0 and (len(x) - 1) % stride != 0:
+        x_bin = np.append(x_bin, x[-1])
+        y_bin = np.append(y_bin, y[-1])
 
     p = lines.line(
         [x_bin], [y_bin],
@@ -89,7 +161,53 @@ def cumulative_depth_from_bed(df: pd.DataFrame, bins: int = 2000, **kwargs):
     return p
 
 
-def depth_coverage(depth_file, xlim=(None, None), ylim=(None, None), **kwargs):
+def _downsample_steps(start, end, depths, max_points):
+    """Average depths over runs of consecutive regions.
+
+    :param start: region start positions.
+    :param end: region end positions.
+    :param depths: list of depth arrays for the regions.
+    :param max_points: maximum number of regions to return, None for no
+        limit.
+
+    :returns: tuple of start positions and list of (length weighted) mean
+        depths of the merged regions.
+    """
+    if max_points is None or len(start) <= max_points:
+        return start, depths
+    stride = -(-len(start) // max_points)
+    runs = np.arange(0, len(start), stride)
+    length = (end - start).astype(float)
+    total = np.add.reduceat(length, runs)
+    depths = [np.add.reduceat(d * length, runs) / total for d in depths]
+    return start[runs], depths
+
+
+def _split_by_ref(refs, columns):
+    """Split BED columns by reference.
+
+    :param refs: categorical series of reference names, with sorted
+        categories as read by `_read_depth_bed`.
+    :param columns: list of arrays to split.
+
+    :returns: iterator of (reference, list of arrays) in order of reference
+        name.
+    """
+    codes = refs.cat.codes.to_numpy()
+    if np.any(codes[1:] < codes[:-1]):
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+        columns = [column[order] for column in columns]
+    # the arrays for each reference are views into the columns
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    names = refs.cat.categories[codes[np.r_[0, bounds]]] if len(codes) else []
+    splits = [np.split(column, bounds) for column in columns]
+    return zip(names, zip(*splits))
+
+
+def depth_coverage(
+        depth_file, xlim=(None, None), ylim=(None, None), max_points=20000,
+        cache=False, **kwargs):
     """Create plot of depth coverage by region per ref name.
 
     :param depth_file: depth file output from mosdepth
@@ -97,17 +215,22 @@ def depth_coverage(depth_file, xlim=(None, None), ylim=(None, None), **kwargs):
         trigger calculation from the data.
     :param ylim: tuple for plotting limits (start, end). A value None will
         trigger calculation from the data.
+    :param max_points: maximum number of steps to plot per reference,
+        depths of consecutive regions are averaged to meet this limit.
+    :param cache: reuse the result of previous reads of unmodified depth
+        files, see `_read_depth_bed`.
 
     :returns: a list of bokeh plots.
     """
-    depth_file = pd.read_csv(depth_file, sep='\t')
-    depth_file.columns = ['ref', 'start', 'end', 'depth']
-    all_ref = dict(tuple(depth_file.groupby(['ref'])))
+    depth_file = _read_depth_bed(depth_file, cache=cache)
+    columns = [
+        depth_file[x].to_numpy() for x in ('start', 'end', 'depth')]
     plots = []
-    for ref in sorted(all_ref):
-        depths = all_ref[ref]
+    for ref, (start, end, depth) in _split_by_ref(
+            depth_file['ref'], columns):
+        start, (depth,) = _downsample_steps(start, end, [depth], max_points)
         plot = lines.steps(
-            list([depths['start']]), list([depths['depth']]),
+            [start], [depth],
             colors=[Colors.cerulean], mode='after',
             x_axis_label='Position along reference',
             y_axis_label='Sequencing depth / Bases',
@@ -118,7 +241,8 @@ def depth_coverage(depth_file, xlim=(None, None), ylim=(None, None), **kwargs):
 
 
 def depth_coverage_orientation(
-        fwd, rev, xlim=(None, None), ylim=(None, None), **kwargs):
+        fwd, rev, xlim=(None, None), ylim=(None, None), max_points=20000,
+        cache=False, **kwargs):
     """Create plot of depth coverage by region per ref name with fwd and rev.
 
     :param fwd: fwd depth file output from mosdepth
@@ -127,21 +251,30 @@ def depth_coverage_orientation(
         trigger calculation from the data.
     :param ylim: tuple for plotting limits (start, end). A value None will
         trigger calculation from the data.
+    :param max_points: maximum number of steps to plot per reference,
+        depths of consecutive regions are averaged to meet this limit.
+    :param cache: reuse the result of previous reads of unmodified depth
+        files, see `_read_depth_bed`.
 
     :returns: a list of bokeh plots.
     """
-    depth_file = pd.read_csv(fwd, sep='\t')
-    depth_file.columns = ['ref', 'start', 'end', 'fwd']
-    rev_file = pd.read_csv(rev, sep='\t')
-    rev_file.columns = ['ref', 'start', 'end', 'rev']
-    depth_file['rev'] = rev_file['rev']
-    all_ref = dict(tuple(depth_file.groupby(['ref'])))
+    depth_file = _read_depth_bed(fwd, value='fwd', cache=cache)
+    # the regions are shared with fwd, so read just the depths
+    rev_depth = _read_depth_bed(
+        rev, value='rev', regions=False, cache=cache)
+    if len(rev_depth) != len(depth_file):
+        raise ValueError(
+            "`fwd` and `rev` files should contain the same regions.")
+    columns = [
+        depth_file[x].to_numpy() for x in ('start', 'end', 'fwd')]
+    columns.append(rev_depth['rev'].to_numpy())
     plots = []
-    for ref in sorted(all_ref):
-        depths = all_ref[ref]
+    for ref, (start, end, fwd, rev) in _split_by_ref(
+            depth_file['ref'], columns):
+        start, (fwd, rev) = _downsample_steps(
+            start, end, [fwd, rev], max_points)
         plot = lines.steps(
-            [list(depths['start']), list(depths['start'])],
-            [list(depths['fwd']), list(depths['rev'])],
+            [start, start], [fwd, rev],
             colors=[Colors.cerulean, Colors.feldgrau],
             names=['fwd', 'rev'], mode='after',
             x_axis_label='Position along reference',
@@ -155,7 +288,7 @@ def depth_coverage_orientation(
 def full_report(
         depth_file, fwd, rev, header=_full_report_header, report=None,
         sample_counts=False,
-        tab=False, **kwargs):
+        tab=False, cache=False, **kwargs):
     """Create a report section from the output of fastcat.
 
     :param depth_file: a depth file outout from mosdepth.
@@ -164,6 +297,8 @@ def full_report(
     :param header: a markdown formatted header.
     :param report: an HTMLSection instances
     :param tab: tabular output
+    :param cache: reuse the result of previous reads of unmodified depth
+        files, useful when creating several reports from the same files.
 
     :returns: an HTMLSection instance, if `report`
         was provided the given instance is modified and returned.
@@ -171,8 +306,8 @@ def full_report(
     report = _maybe_new_report(report)
     report.markdown(header)
 
-    plots_coverage = depth_coverage(depth_file)
-    plots_orient = depth_coverage_orientation(fwd, rev)
+    plots_coverage = depth_coverage(depth_file, cache=cache)
+    plots_orient = depth_coverage_orientation(fwd, rev, cache=cache)
 
     if tab:
         tab1 = Panel(
@@ -4,7 +4,6 @@ import argparse
 
 from bokeh.layouts import layout
 import numpy as np
-import pandas as pd
 
 from aplanat import annot, bars, hist
 from aplanat.report import _maybe_new_report, HTMLReport
@@ -25,13 +24,10 @@ def read_length_plot(
     The minimum and maximum lengths are used only to annotate the plot
     (not filter the data).
     """
-    total_bases = seq_summary['read_length'].sum()
-    try:
-        mean_length = total_bases / len(seq_summary)
-    except ZeroDivisionError:
-        mean_length = 0
-    median_length = np.median(seq_summary['read_length'])
-    datas = [seq_summary['read_length']]
+    lengths = seq_summary['read_length'].to_numpy()
+    mean_length = lengths.sum() / lengths.size if lengths.size else 0
+    median_length = np.median(lengths)
+    datas = [lengths]
     length_hist = hist.histogram(
         datas, colors=[Colors.cerulean], bins=100,
         title="Read length distribution.",
@@ -81,19 +77,15 @@ def sample_read_counts(seq_summary, min_len=None, max_len=None):
     :param min_len: minimum length.
     :param max_len: maximum length.
     """
+    samples = seq_summary['sample_name']
+    lengths = seq_summary['read_length'].to_numpy()
+    keep = samples.notna().to_numpy()
     if min_len is not None:
-        seq_summary = seq_summary.loc[
-            (seq_summary['read_length'] > min_len)]
+        keep = keep & (lengths > min_len)
     if max_len is not None:
-        seq_summary = seq_summary.loc[
-            (seq_summary['read_length'] < max_len)]
-    sample_counts = (
-        pd.DataFrame(seq_summary['sample_name'].value_counts())
-        .sort_index()
-        .reset_index()
-        .rename(
-            columns={'index': 'sample', 'sample_name': 'count'})
-        )
+        keep = keep & (lengths < max_len)
+    samples, counts = np.unique(
+        samples.to_numpy()[keep], return_counts=True)
 
     title = 'Number of reads per barcode'
     if min_len is not None or max_len is not None:
@@ -105,8 +97,8 @@ def sample_read_counts(seq_summary, min_len=None, max_len=None):
         title += " (filtered by {}length{}).".format(t0, t1)
 
     plot = bars.simple_bar(
-        sample_counts['sample'].astype(str), sample_counts['count'],
-        colors=[Colors.cerulean]*len(sample_counts),
+        samples.astype(str), counts,
+        colors=[Colors.cerulean]*len(samples),
         title=title,
         plot_width=None)
     plot.xaxis.major_label_orientation = 3.14/2
@@ -7,19 +7,28 @@ import sys
 import typing
 
 from bokeh.layouts import gridplot, layout
-from bokeh.models import Div, HoverTool, Panel, Slope, Tabs, Title
+from bokeh.models import \
+    ColumnDataSource, Div, HoverTool, Panel, Slope, Tabs, Title
 from bokeh.palettes import Category20c
 from bokeh.plotting import figure
 from bokeh.transform import cumsum
-import markdown
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from aplanat import hist, points
 from aplanat.report import HTMLReport, HTMLSection
 from aplanat.util import Colors
 
+# per-item histograms of counts in fixed bins
+_binned_fields = (
+    'alignment_accuracies', 'alignment_coverages',
+    'aligned_qualities', 'read_lengths')
+
 
 class PlotMappingStats(HTMLSection):
     """Build an aplanat dashboard from mapula's json output."""
@@ -32,10 +41,11 @@ class PlotMappingStats(HTMLSection):
         """Load the json file and output the dashboard."""
         super().__init__()
         self.json = json
-        self.md = markdown.Markdown()
         self.counts = counts
 
-        self.data = self.load_data(self.json)
+        # the observed counts are only plotted against expected counts
+        drop = () if counts else ('observed_references',)
+        self.data = self.load_data(self.json, drop=drop)
         self.build_report(
             self.counts,
             **self.data
@@ -44,19 +54,44 @@ class PlotMappingStats(HTMLSection):
     @staticmethod
     def load_data(
         path: str,
+        drop: typing.Iterable[str] = (),
     ) -> dict:
-        """Load_data."""
+        """Load_data.
+
+        :param path: mapula JSON file.
+        :param drop: fields to remove from each item, such that unused
+            data is not retained.
+
+        If `orjson` is installed it is used for parsing, else the standard
+        library `json` module. Binned distributions are converted to
+        numpy arrays.
+        """
         try:
-            with open(path) as data:
-                try:
-                    return json.load(data)
-                except json.decoder.JSONDecodeError:
-                    print('Error loading data from {}'.format(
-                        path))
-                    raise
+            with open(path, 'rb') as data:
+                content = data.read()
         except IOError:
             print("Path {} cannot be opened".format(path))
             raise
+        parsed = None
+        if orjson is not None:
+            try:
+                parsed = orjson.loads(content)
+            except orjson.JSONDecodeError:
+                # e.g. NaN values, which only `json` accepts
+                pass
+        if parsed is None:
+            try:
+                parsed = json.loads(content)
+            except json.decoder.JSONDecodeError:
+                print('Error loading data from {}'.format(path))
+                raise
+        for value in parsed.values():
+            for field in drop:
+                value.pop(field, None)
+            for field in _binned_fields:
+                if field in value:
+                    value[field] = np.asarray(value[field])
+        return parsed
 
     def build_report(
         self,
@@ -65,25 +100,26 @@ class PlotMappingStats(HTMLSection):
     ):
         """Build_report."""
         tabs = []
+        nonempty = self.nonempty_distributions(data)
 
         # Plot summary
         summary_tab = self.build_summary_tab(data)
         tabs.append(summary_tab)
 
         # Plot accuracy
-        acc_tab = self.build_accuracy_tab(data)
+        acc_tab = self.build_accuracy_tab(data, nonempty)
         tabs.append(acc_tab)
 
         # Plot quality
-        qual_tab = self.build_quality_tab(data)
+        qual_tab = self.build_quality_tab(data, nonempty)
         tabs.append(qual_tab)
 
         # Plot lengths
-        len_tab = self.build_length_tab(data)
+        len_tab = self.build_length_tab(data, nonempty)
         tabs.append(len_tab)
 
         # Plot coverage
-        cov_tab = self.build_coverage_tab(data)
+        cov_tab = self.build_coverage_tab(data, nonempty)
         tabs.append(cov_tab)
 
         # Plot control
@@ -95,6 +131,18 @@ class PlotMappingStats(HTMLSection):
         panel = Tabs(tabs=tabs)
         self.plot(panel)
 
+    @staticmethod
+    def nonempty_distributions(data):
+        """Find the binned distributions of each item which contain counts.
+
+        :param data: mapula data, keyed by item.
+
+        :returns: dict mapping item keys to sets of field names.
+        """
+        return {
+            key: {field for field in _binned_fields if np.any(value[field])}
+            for key, value in data.items()}
+
     def build_summary_tab(self, data):
         """Build_summary_tab."""
         alignment_plots = [
@@ -132,12 +180,14 @@ class PlotMappingStats(HTMLSection):
         main = layout(plots, sizing_mode="scale_width")
         return Panel(child=main, title="Summary")
 
-    def build_accuracy_tab(self, data):
+    def build_accuracy_tab(self, data, nonempty=None):
         """Build_accuracy_tab."""
+        if nonempty is None:
+            nonempty = self.nonempty_distributions(data)
         accuracy_plots = [
             self.plot_accuracy_distribution(value)
-            for value in data.values()
-            if sum(value['alignment_accuracies'])
+            for key, value in data.items()
+            if 'alignment_accuracies' in nonempty[key]
         ]
 
         if not accuracy_plots:
@@ -162,12 +212,14 @@ class PlotMappingStats(HTMLSection):
         main = layout(plots, sizing_mode="scale_width")
         return Panel(child=main, title="Accuracy")
 
-    def build_coverage_tab(self, data):
+    def build_coverage_tab(self, data, nonempty=None):
         """Build_coverage_tab."""
+        if nonempty is None:
+            nonempty = self.nonempty_distributions(data)
         coverage_plots = [
             self.plot_coverage_distribution(value)
-            for value in data.values()
-            if sum(value['alignment_coverages'])
+            for key, value in data.items()
+            if 'alignment_coverages' in nonempty[key]
         ]
 
         if not coverage_plots:
@@ -193,12 +245,14 @@ class PlotMappingStats(HTMLSection):
         main = layout(plots, sizing_mode="scale_width")
         return Panel(child=main, title="Coverage")
 
-    def build_length_tab(self, data):
+    def build_length_tab(self, data, nonempty=None):
         """Build_length_tab."""
+        if nonempty is None:
+            nonempty = self.nonempty_distributions(data)
         length_plots = [
             self.plot_read_length_distribution(value)
-            for value in data.values()
-            if sum(value['read_lengths'])
+            for key, value in data.items()
+            if 'read_lengths' in nonempty[key]
         ]
 
         if not length_plots:
@@ -223,12 +277,14 @@ class PlotMappingStats(HTMLSection):
         main = layout(plots, sizing_mode="scale_width")
         return Panel(child=main, title="Length")
 
-    def build_quality_tab(self, data):
+    def build_quality_tab(self, data, nonempty=None):
         """Build_quality_tab."""
+        if nonempty is None:
+            nonempty = self.nonempty_distributions(data)
         quality_plots = [
             self.plot_qscore_distribution(value)
-            for value in data.values()
-            if sum(value['aligned_qualities'])
+            for key, value in data.items()
+            if 'aligned_qualities' in nonempty[key]
         ]
 
         if not quality_plots:
@@ -257,13 +313,13 @@ class PlotMappingStats(HTMLSection):
 
     def build_control_tab(self, data, counts):
         """Build_control_tab."""
-        counts_df = pd.read_csv(counts)
-        counts_df.columns = map(str.lower, counts_df.columns)
+        columns = ['reference', 'expected_count']
+        # parse only the required columns, matched case-insensitively
+        counts_df = pd.read_csv(
+            counts, usecols=lambda col: col.lower() in columns)
+        counts_df.columns = counts_df.columns.str.lower()
 
-        if not all(
-            col in counts_df.columns
-            for col in ['reference', 'expected_count']
-        ):
+        if not all(col in counts_df.columns for col in columns):
             print(
                 "[Error]: Supplied counts file does not "
                 "contain the required columns, "
@@ -272,6 +328,10 @@ class PlotMappingStats(HTMLSection):
             sys.exit(1)
 
         counts_df = counts_df.set_index('reference')
+        # the expected counts are shared by all items
+        countdict = counts_df['expected_count'].to_dict()
+        ref_names = np.array(list(countdict.keys()))
+        expected = np.array(list(countdict.values()))
         required = ['spearmans_rho', 'observed_references']
         text = (
             "This tab becomes available if you "
@@ -291,13 +351,13 @@ class PlotMappingStats(HTMLSection):
 
             observed_expected_corr = (
                 self.plot_observed_vs_expected_correlations(
-                    value, counts_df))
+                    value, ref_names, expected))
             detected_vs_undetected = (
                 self.plot_detected_vs_undetected_references(
                     value, counts_df))
             observations_vs_expected_molarity = (
                 self.plot_observations_vs_expected_molarity(
-                    value, counts_df))
+                    value, ref_names, expected))
 
             plots.append([Div(text=f'<h3>{key}</h3>')])
             plots.append([observed_expected_corr, detected_vs_undetected])
@@ -309,19 +369,22 @@ class PlotMappingStats(HTMLSection):
     def plot_base_pairs(self, data):
         """Plot_base_pairs."""
         base_pairs = {
-            self.abbreviate_name(k, data): v['base_pairs']
-            for k, v in data.items()
+            self.abbreviate_item(v): v['base_pairs']
+            for v in data.values()
         }
-
-        data = pd.Series(base_pairs).reset_index(
-            name='value').rename(columns={'index': 'group'})
-        data['angle'] = data['value']/data['value'].sum() * 2 * math.pi
-        if Category20c.get(len(base_pairs)):
-            data['color'] = Category20c[len(base_pairs)]
-        else:
-            data['color'] = Colors.light_cornflower_blue
-        data['percentage'] = (data['value']/data['value'].sum())
-        data['megabases'] = (data['value'] / 1000000)
+        groups = list(base_pairs.keys())
+        values = np.array(list(base_pairs.values()))
+        total = values.sum()
+        percentage = values / total
+        colors = Category20c.get(len(values))
+        if not colors:
+            colors = [Colors.light_cornflower_blue] * len(values)
+        source = ColumnDataSource(dict(
+            group=groups, value=values,
+            angle=percentage * (2 * math.pi),
+            color=list(colors),
+            percentage=percentage,
+            megabases=values / 1000000))
 
         plot = figure(
             plot_height=200,
@@ -342,7 +405,7 @@ class PlotMappingStats(HTMLSection):
             line_color="white",
             fill_color='color',
             legend_field='group',
-            source=data
+            source=source
         )
 
         plot.axis.axis_label = None
@@ -358,7 +421,7 @@ class PlotMappingStats(HTMLSection):
             ('count (mb)', '@megabases{0.00}')
         ]
 
-        total = "Total: {:.2f}mb".format(data['megabases'].sum())
+        total = "Total: {:.2f}mb".format(total / 1000000)
         self.add_plot_title(plot, {}, total)
         self.style_plot(plot)
         return plot
@@ -397,13 +460,12 @@ class PlotMappingStats(HTMLSection):
 
     def plot_accuracy_distribution(self, data):
         """Plot_accuracy_distribution."""
-        counts = []
-        for index, item in enumerate(data['alignment_accuracies']):
-            for i in range(item):
-                counts.append(index/10)
+        # data are already binned, weight each occupied bin by its count
+        counts = np.asarray(data['alignment_accuracies'])
+        index = np.flatnonzero(counts)
 
         plot = hist.histogram(
-            [counts],
+            [index / 10], weights=[counts[index]],
             bins=100,
             height=300,
             width=400,
@@ -420,13 +482,11 @@ class PlotMappingStats(HTMLSection):
 
     def plot_coverage_distribution(self, data):
         """Plot_coverage_distribution."""
-        counts = []
-        for index, item in enumerate(data['alignment_coverages']):
-            for i in range(item):
-                counts.append(index)
+        counts = np.asarray(data['alignment_coverages'])
+        index = np.flatnonzero(counts)
 
         plot = hist.histogram(
-            [counts],
+            [index], weights=[counts[index]],
             bins=101,
             height=300,
             width=400,
@@ -446,13 +506,11 @@ class PlotMappingStats(HTMLSection):
 
     def plot_qscore_distribution(self, data):
         """Plot_qscore_distribution."""
-        counts = []
-        for index, item in enumerate(data['aligned_qualities']):
-            for i in range(item):
-                counts.append(index/10)
+        counts = np.asarray(data['aligned_qualities'])
+        index = np.flatnonzero(counts)
 
         plot = hist.histogram(
-            [counts],
+            [index / 10], weights=[counts[index]],
             bins=600,
             height=300,
             width=400,
@@ -469,17 +527,13 @@ class PlotMappingStats(HTMLSection):
 
     def plot_read_length_distribution(self, data):
         """Plot_read_length_distribution."""
-        counts = []
-        max_length = 0
-        for index, item in enumerate(data['read_lengths']):
-            for i in range(item):
-                counts.append(index * 50)
-                length = index * 50
-                if length > max_length:
-                    max_length = length
+        counts = np.asarray(data['read_lengths'])
+        index = np.flatnonzero(counts)
+        # occupied bins are in order, the last is the longest
+        max_length = index[-1] * 50 if len(index) else 0
 
         plot = hist.histogram(
-            [counts],
+            [index * 50], weights=[counts[index]],
             bins=1000,
             height=300,
             width=400,
@@ -494,40 +548,28 @@ class PlotMappingStats(HTMLSection):
         self.add_plot_title(plot, data, n50)
         return plot
 
-    def plot_observed_vs_expected_correlations(self, value, counts):
+    def plot_observed_vs_expected_correlations(
+            self, value, ref_names, expected):
         """Plot_observed_vs_expected_correlations."""
-        names = []
-        obs = []
-        exps = []
+        observed = value['observed_references']
+        obs = np.fromiter(
+            (observed.get(name, 0) for name in ref_names),
+            dtype=np.int64, count=len(ref_names))
 
-        countdict = counts.to_dict()['expected_count']
-        for name, exp in countdict.items():
-            names.append(name)
-            exps.append(exp)
-            obs.append(value['observed_references'].get(name, 0))
+        log_obs = np.log10(obs + 1.0)
+        log_exp = np.log10(np.asarray(expected, dtype=float) + 1.0)
 
-        data = pd.DataFrame(
-            zip(names, obs, exps),
-            columns=['Name', 'Observed', 'Expected']
-        )
-
-        data['log_obs'] = [math.log(y+1, 10) for y in data['Observed']]
-        data['log_exp'] = [math.log(y+1, 10) for y in data['Expected']]
-
-        model = LinearRegression().fit(
-            np.array(data['log_exp'].values).reshape(-1, 1),
-            data['log_obs']
-        )
+        slope, intercept = np.polyfit(log_exp, log_obs, 1)
 
         regression_line = Slope(
-            gradient=model.coef_[0],
-            y_intercept=model.intercept_,
+            gradient=slope,
+            y_intercept=intercept,
             line_color=Colors.light_cornflower_blue
         )
 
         plot = points.points(
-            [data['log_exp'].tolist()],
-            [data['log_obs'].tolist()],
+            [log_exp],
+            [log_obs],
             height=350,
             tools="",
             toolbar_location=None,
@@ -551,30 +593,24 @@ class PlotMappingStats(HTMLSection):
         self.style_plot(plot)
         return plot
 
-    def plot_observations_vs_expected_molarity(self, value, counts):
+    def plot_observations_vs_expected_molarity(
+            self, value, ref_names, expected):
         """Plot_observations_vs_expected_molarity."""
-        names = []
-        obs = []
-        exps = []
-
-        countdict = counts.to_dict()['expected_count']
-        for name, exp in countdict.items():
-            names.append(name)
-            exps.append(exp)
-            obs.append(value['observed_references'].get(name, 0))
-
+        observed = value['observed_references']
+        obs = np.fromiter(
+            (observed.get(name, 0) for name in ref_names),
+            dtype=np.int64, count=len(ref_names))
         data = pd.DataFrame(
-            zip(names, obs, exps),
-            columns=['Name', 'Observed', 'Expected']
-        )
+            {'Name': ref_names, 'Observed': obs, 'Expected': expected})
 
-        data['log_obs'] = [math.log(y+1, 10) for y in data['Observed']]
-        data['log_exp'] = [math.log(y+1, 10) for y in data['Expected']]
+        data['log_obs'] = np.log10(obs + 1.0)
+        data['log_exp'] = np.log10(np.asarray(expected, dtype=float) + 1.0)
 
         data.sort_values('Expected', inplace=True)
+        names = data['Name'].tolist()
 
         plot = figure(
-            x_range=data['Name'].tolist(),
+            x_range=names,
             plot_height=200,
             toolbar_location=None,
             tools="",
@@ -584,7 +620,7 @@ class PlotMappingStats(HTMLSection):
             title='Observations ordered by increasing expected count'
         )
         plot.vbar(
-            x=data['Name'].tolist(),
+            x=names,
             top=data['log_obs'].values, width=0.9,
             fill_color=Colors.light_cornflower_blue
         )
@@ -644,9 +680,12 @@ class PlotMappingStats(HTMLSection):
 
     def abbreviate_name(self, name, data):
         """Abbreviate the name."""
-        item = data[name]
+        return self.abbreviate_item(data[name])
+
+    @staticmethod
+    def abbreviate_item(item):
+        """Abbreviate the name of an item of the data."""
         fasta = item['fasta']
-        barcode = item['barcode']
         run_id = item['run_id']
 
         if len(fasta) > 20:
@@ -655,7 +694,7 @@ class PlotMappingStats(HTMLSection):
         if len(run_id) > 20:
             run_id = run_id[0:20] + '...'
 
-        return f"{fasta} / {barcode} / {run_id}"
+        return f"{fasta} / {item['barcode']} / {run_id}"
 
     def add_plot_title(self, plot, data, *extra_lines):
         """Annotate plot with titles."""
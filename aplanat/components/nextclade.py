@@ -1,12 +1,35 @@
 """Nextclade reporting section."""
 
 import argparse
+import functools
 
-from jinja2 import Template
 import pkg_resources
 
 from aplanat.report import HTMLReport, HTMLSection
 
+# the nextclade JSON is inserted verbatim between these
+_html_head = """\
+    <div>
+    <nxt-table>
+        <script defer="">
+        const data = """
+_html_tail = """
+        var nxt = document.querySelector('nxt-table')
+        nxt.data = data.results
+        </script>
+    </nxt-table>
+    </div>
+    """
+
+
+@functools.lru_cache(maxsize=None)
+def _read_script():
+    """Read the nextclade web component, once per process."""
+    script = pkg_resources.resource_filename(
+        'aplanat', 'data/nextclade.html')
+    with open(script, encoding='utf8') as fh:
+        return fh.read()
+
 
 class NextClade(HTMLSection):
     """A nextclade report component."""
@@ -17,19 +40,6 @@ class NextClade(HTMLSection):
         :param json: json output file from nextclade CLI.
         """
         super().__init__()
-        template = Template(
-            """\
-            <div>
-            <nxt-table>
-                <script defer="">
-                const data = {{ data }}
-                var nxt = document.querySelector('nxt-table')
-                nxt.data = data.results
-                </script>
-            </nxt-table>
-            </div>
-            """  # noqa
-        )
         if add_title:
             self.markdown('''
 ### NextClade analysis
@@ -37,12 +47,8 @@ The following view is produced by the
 [nextclade](https://clades.nextstrain.org/) software.
 ''')
         with open(json, encoding='utf8') as fh:
-            self._add_item(
-                template.render(data=fh.read()))
-        script = pkg_resources.resource_filename(
-            'aplanat', 'data/nextclade.html')
-        with open(script, encoding='utf8') as fh:
-            self._script = fh.read()
+            self._add_item(''.join((_html_head, fh.read(), _html_tail)))
+        self._script = _read_script()
 
     def _extra_components(self):
         """Return script and div for report."""
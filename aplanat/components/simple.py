@@ -34,23 +34,31 @@ def version_table(
     report.markdown(header)
 
     if os.path.isdir(versions):
-        versions = [os.path.join(versions, x) for x in os.listdir(versions)]
+        # subdirectories cannot be read, skip them without a warning
+        with os.scandir(versions) as entries:
+            versions = [x.path for x in entries if x.is_file()]
     elif os.path.isfile(versions):
         versions = [versions]
     else:
         raise IOError('`versions` should be a file or directory.')
 
+    columns = ['Name', 'Version']
     verdata = list()
     for fname in versions:
         logger.info(f"Reading versions from file: {fname}.")
         try:
-            with open(fname, 'r') as fh:
-                for line in fh.readlines():
-                    name, version = line.strip().split(',')
-                    verdata.append((name, version))
+            data = pd.read_csv(
+                fname, header=None, dtype=str, keep_default_na=False)
+            if data.shape[1] != len(columns):
+                raise ValueError("Expected 'software,version' lines.")
+            data.columns = columns
+            verdata.append(data)
         except Exception:
             logger.warning(f"Failed to read versions from: {fname}.")
-    verdata = pd.DataFrame(verdata, columns=('Name', 'Version'))
+    if verdata:
+        verdata = pd.concat(verdata, ignore_index=True)
+    else:
+        verdata = pd.DataFrame(columns=columns)
     report.table(verdata, index=False, th_color=th_color)
     return report
 
@@ -1,5 +1,6 @@
 """Plots which are more graphics than plots."""
 
+import functools
 import os
 import tempfile
 
@@ -15,23 +16,71 @@ from si_prefix import si_format
 import sigfig
 
 
+_css_file = pkg_resources.resource_filename(
+    __package__, 'data/fontawesome.css')
+_ttf_files = [
+    pkg_resources.resource_filename(__package__, 'data/{}'.format(x))
+    for x in ('fa-regular-400.ttf', 'fa-solid-900.ttf')]
+
+
+@functools.lru_cache(maxsize=None)
+def _icon_sets():
+    """Load the icon fonts, shared between all `IconRGBA` instances.
+
+    :returns: tuple of icon sets, mapping of icon names to their set, and
+        a temporary directory for rendering.
+    """
+    icon_sets = [IconFont(_css_file, ttf) for ttf in _ttf_files]
+    icons = dict()
+    for i, icon_set in enumerate(icon_sets):
+        icons.update(
+            {k: (i, icon_set) for k in icon_set.css_icons.keys()})
+    return icon_sets, icons, tempfile.TemporaryDirectory()
+
+
+@functools.lru_cache(maxsize=256)
+def _render_icon(icon, size, color, scale):
+    """Render an icon to a (read-only) RGBA array."""
+    icon_sets, icons, tmpdir = _icon_sets()
+    fname = icon + '.png'
+    tmpfile = os.path.join(tmpdir.name, fname)
+    try:
+        icon_set = icon_sets[icons[icon][0]]
+    except KeyError:
+        raise KeyError('Unknown icon: {}.'.format(icon))
+    icon_set.export_icon(
+        icon, size, color, scale, filename=fname, export_dir=tmpdir.name)
+    if not os.path.isfile(tmpfile):
+        raise RuntimeError('Image not produced.')
+    # asarray wraps the decoded bytes, so flipping makes the only copy
+    with Image.open(tmpfile) as image:
+        image = np.ascontiguousarray(np.asarray(image)[::-1, :, :])
+    image.flags.writeable = False
+    return image
+
+
 class IconRGBA:
     """Wrapper to icon_font_to_png for multiple ttfs."""
 
     def __init__(self):
         """Initialize the class."""
-        self.css_file = pkg_resources.resource_filename(
-            __package__, 'data/fontawesome.css')
-        self.ttf_files = [
-            pkg_resources.resource_filename(__package__, 'data/{}'.format(x))
-            for x in ('fa-regular-400.ttf', 'fa-solid-900.ttf')]
-        self.icon_sets = [
-            IconFont(self.css_file, ttf) for ttf in self.ttf_files]
-        self.icons = dict()
-        for i, icon_set in enumerate(self.icon_sets):
-            self.icons.update(
-                {k: (i, icon_set) for k in icon_set.css_icons.keys()})
-        self.tmpdir = tempfile.TemporaryDirectory()
+        self.css_file = _css_file
+        self.ttf_files = list(_ttf_files)
+
+    @property
+    def icon_sets(self):
+        """Return the icon fonts, loading them on first use."""
+        return _icon_sets()[0]
+
+    @property
+    def icons(self):
+        """Return a mapping of icon names to (index, icon set)."""
+        return _icon_sets()[1]
+
+    @property
+    def tmpdir(self):
+        """Return the temporary directory used for rendering."""
+        return _icon_sets()[2]
 
     def rgba(self, icon, size, color='black', scale='auto', uint32=True):
         """Create RGBA array for icon.
@@ -43,20 +92,13 @@ class IconRGBA:
             or 'auto' for automatic scaling
         :param uint32: return a two-dimension uint32-packed array (as
             required by bokeh image_rgba).
+
+        Rendered icons are cached, the returned array is a copy.
         """
-        fname = icon + '.png'
-        tmpfile = os.path.join(self.tmpdir.name, fname)
-        try:
-            icon_set = self.icon_sets[self.icons[icon][0]]
-        except KeyError:
-            raise KeyError('Unknown icon: {}.'.format(icon))
-        icon_set.export_icon(
-            icon, size, color, scale, filename=fname,
-            export_dir=self.tmpdir.name)
-        if not os.path.isfile(tmpfile):
-            raise RuntimeError('Image not produced.')
-        image = np.ascontiguousarray(
-            np.array(Image.open(tmpfile))[::-1, :, :])
+        # colors are cache keys so must be hashable, e.g. an RGB array
+        if not isinstance(color, str):
+            color = tuple(np.asarray(color).tolist())
+        image = _render_icon(icon, size, color, scale).copy()
         if uint32:
             image = image.view(dtype=np.uint32).reshape(size, size)
         return image
@@ -96,6 +138,19 @@ class InfoGraphItems(dict):
             self.append(*i)
 
 
+def _format_value(value, unit):
+    """Format an infographic value for display.
+
+    :param value: headline value, strings are returned as is.
+    :param unit: additional suffix after SI unit suffix.
+    """
+    if isinstance(value, str):
+        return value
+    if unit == '%':
+        return "{}%".format(sigfig.round(value, 3))
+    return si_format(value) + unit
+
+
 def infographic(items, **kwargs):
     """Create and infographic 'plot'.
 
@@ -113,29 +168,29 @@ def infographic(items, **kwargs):
         provided the helper is initiated in a previous cell.
 
     """
+    # keep the first item for each label
+    unique = dict()
+    for item in items:
+        unique.setdefault(item[0], item)
+    items = [
+        (label, _format_value(value, unit), icon)
+        for label, value, icon, unit in unique.values()]
+
+    width, height = 175, 100
+    aspect = height / width
+
     plots = list()
-    seen = set()
-    for label, value, icon, unit in items:
-        if label in seen:
-            continue
-        if not isinstance(value, str):
-            if unit == '%':
-                value = "{}%".format(sigfig.round(value, 3))
-            else:
-                value = si_format(value) + unit
-        seen.add(label)
-        width, height = 175, 100
-        aspect = height / width
+    for label, value, icon in items:
         p = figure(
             output_backend='webgl',
             plot_width=width, plot_height=height,
+            x_range=Range1d(start=0.1, end=0.9, bounds=(0.1, 0.9)),
+            y_range=Range1d(start=0.1, end=0.9, bounds=(0.1, 0.9)),
             title=None, toolbar_location=None)
         p.axis.visible = False
         p.grid.visible = False
         p.outline_line_color = None
         p.rect([0.5], [0.5], [1.0], [1.0], fill_color="#2171b5")
-        p.x_range = Range1d(start=0.1, end=0.9, bounds=(0.1, 0.9))
-        p.y_range = Range1d(start=0.1, end=0.9, bounds=(0.1, 0.9))
         p.add_layout(
             Label(
                 x=0.15, y=0.45, text=value, text_color="#DEEBF7",
@@ -65,7 +65,7 @@ def histogram(
     else:
         bins = np.linspace(x_lim.min, x_lim.max, num=bins)
     if normalize:
-        total_weight = sum(sum(x) for x in weights)
+        total_weight = sum(np.sum(x) for x in weights)
 
     defaults = {
         "output_backend": "webgl",
@@ -76,7 +76,7 @@ def histogram(
     for data, weight, name, color in zip(datas, weights, names, colors):
         counts, edges = np.histogram(data, weights=weight, bins=bins)
         if normalize:
-            counts = counts.astype(float) / total_weight
+            counts = counts / total_weight
         y_lim.accumulate(counts)
         kw = {}
         if name is not None:
@@ -62,24 +62,27 @@ def facet_grid(
     facet_products = list(itertools.product(
         enumerate(facet_x_values), enumerate(facet_y_values)))
 
+    # find the rows of every facet and colour combination in one pass
+    group_columns = (facet_x, facet_y, aes.get('col'))
+    group_keys = [key for key in group_columns if key is not None]
+    if group_keys:
+        groups = {
+            k if isinstance(k, tuple) else (k,): v for k, v in
+            df.groupby(group_keys, sort=False).indices.items()}
+
     plots = list()
     for (px, fx), (py, fy) in facet_products:
-        d = df
-        if fx is not None and fy is not None:
-            d = df.loc[(df[facet_x] == fx) & (df[facet_y] == fy)]
-        elif fx is not None:
-            d = df.loc[df[facet_x] == fx]
-        elif fy is not None:
-            d = df.loc[df[facet_y] == fy]
-
         x_data = list()
         y_data = list()
         colors = list()
         for col in col_values:
-            if col is not None:
-                dcol = d.loc[d[aes['col']] == col]
+            if group_keys:
+                rows = groups.get(tuple(
+                    value for key, value in zip(group_columns, (fx, fy, col))
+                    if key is not None), [])
+                dcol = df.iloc[rows]
             else:
-                dcol = d
+                dcol = df
             if len(dcol) == 0:
                 continue
             colors.append(cols_dict[col])
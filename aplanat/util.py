@@ -124,8 +124,8 @@ class Limiter(object):
 
         """
         if len(data) > 0:
-            self.min = min(self.min, min(data))
-            self.max = max(self.max, max(data))
+            self.min = min(self.min, np.nanmin(data))
+            self.max = max(self.max, np.nanmax(data))
         return self
 
     def fix(self, lower=None, upper=None):
@@ -0,0 +1,23 @@
+"""Tests for aplanat.Grid."""
+
+from aplanat import Grid
+
+
+def test_empty_grid():
+    """An empty grid has a single empty row."""
+    grid = Grid(width=3)
+    assert grid.rows == [[]]
+    assert list(grid) == [[]]
+    assert len(grid) == 1
+    assert grid[-1] == []
+
+
+def test_partial_last_row():
+    """Items are split into rows, the last being partially filled."""
+    grid = Grid(width=3)
+    grid.extend(range(5))
+    assert grid.rows == [[0, 1, 2], [3, 4]]
+    assert len(grid) == 2
+    grid.add(5)
+    assert grid.rows == [[0, 1, 2], [3, 4, 5], []]
+    assert len(grid) == 3